@@ -1,17 +1,29 @@
 import os
 import time
 import json
+import asyncio
+import queue
 import boto3
 import logging
 import requests
 import threading
 import subprocess
+import multiprocessing
 import hashlib
-from io import BytesIO
+import gc
+import ctypes
+import shutil
+import tempfile
+import zlib
 from typing import List, Dict, Any
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from fastapi import FastAPI, Query
 from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Set up boto3 default session with region
 boto3.setup_default_session(region_name="us-east-1")
@@ -43,48 +55,120 @@ try:
         logStreamName=log_stream_name
     )
     
-    # Set up a custom logger for CloudWatch
-    sequence_token = None
-    
-    def log_to_cloudwatch(message, level="INFO"):
-        global sequence_token
-        try:
-            formatted_message = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} [{level}] {message}"
-            
+    class CloudWatchBatcher:
+        """Buffers log events in memory and ships them to CloudWatch from a background thread."""
+        MAX_BATCH_EVENTS = 10000
+        MAX_BATCH_BYTES = 1024 * 1024
+        EVENT_OVERHEAD_BYTES = 26
+        FLUSH_INTERVAL_SECONDS = 5
+        # Queued by flush() so the flush thread ships its in-progress batch and exits
+        STOP = object()
+
+        def __init__(self, client, group_name: str, stream_name: str):
+            self.client = client
+            self.group_name = group_name
+            self.stream_name = stream_name
+            self.events = queue.Queue()
+            self.flush_thread = threading.Thread(target=self._flush_loop)
+            self.flush_thread.daemon = True
+
+        def start(self):
+            # Started once the extraction pool has forked, events logged before then wait in the queue
+            self.flush_thread.start()
+
+        def put(self, message, level="INFO"):
+            now = datetime.now()
+            self.events.put({
+                'timestamp': int(now.timestamp() * 1000),
+                'message': f"{now.strftime('%Y-%m-%d %H:%M:%S')} [{level}] {message}"
+            })
+
+        def _next_batch(self):
+            # Block until at least one event arrives, then keep draining until the
+            # batch is full or the flush interval has elapsed. Returns (batch, stopped)
+            event = self.events.get()
+            if event is self.STOP:
+                return [], True
+            batch = [event]
+            batch_bytes = len(event['message'].encode('utf-8')) + self.EVENT_OVERHEAD_BYTES
+            deadline = time.time() + self.FLUSH_INTERVAL_SECONDS
+            while len(batch) < self.MAX_BATCH_EVENTS:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self.events.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event is self.STOP:
+                    return batch, True
+                event_bytes = len(event['message'].encode('utf-8')) + self.EVENT_OVERHEAD_BYTES
+                if batch_bytes + event_bytes > self.MAX_BATCH_BYTES:
+                    # Batch would exceed the 1 MiB request limit, ship it and start a new one
+                    self._send(batch)
+                    batch, batch_bytes = [], 0
+                batch.append(event)
+                batch_bytes += event_bytes
+            return batch, False
+
+        def flush(self):
+            # Stop the flush thread first so the batch it is still collecting is sent, not lost
+            if self.flush_thread.is_alive():
+                self.events.put(self.STOP)
+                self.flush_thread.join(timeout=self.FLUSH_INTERVAL_SECONDS * 2)
+            batch = []
+            while True:
+                try:
+                    event = self.events.get_nowait()
+                except queue.Empty:
+                    break
+                if event is not self.STOP:
+                    batch.append(event)
+            # Small tail at shutdown, so only the event count limit matters here
+            for i in range(0, len(batch), self.MAX_BATCH_EVENTS):
+                self._send(batch[i:i + self.MAX_BATCH_EVENTS])
+
+        def _flush_loop(self):
+            while True:
+                batch, stopped = self._next_batch()
+                if batch:
+                    self._send(batch)
+                if stopped:
+                    return
+
+        def _send(self, batch):
+            # Threads timestamp events before queueing them, so a batch can arrive slightly out
+            # of order, and PutLogEvents rejects a whole batch that is not chronological
+            batch.sort(key=lambda event: event['timestamp'])
             kwargs = {
-                'logGroupName': '/ec2/combined-service',
-                'logStreamName': log_stream_name,
-                'logEvents': [
-                    {
-                        'timestamp': int(datetime.now().timestamp() * 1000),
-                        'message': formatted_message
-                    }
-                ]
+                'logGroupName': self.group_name,
+                'logStreamName': self.stream_name,
+                'logEvents': batch
             }
-            
-            if sequence_token:
-                kwargs['sequenceToken'] = sequence_token
-                
-            response = logs_client.put_log_events(**kwargs)
-            sequence_token = response.get('nextSequenceToken')
-        except logs_client.exceptions.InvalidSequenceTokenException as e:
-            # Get the correct sequence token
-            sequence_token = e.response['Error']['Message'].split()[-1].strip("'")
-            log_to_cloudwatch(message, level)  # Try again with correct token
-        except Exception as e:
-            print(f"Error logging to CloudWatch: {str(e)}")
-    
+            try:
+                self.client.put_log_events(**kwargs)
+            except self.client.exceptions.InvalidSequenceTokenException:
+                # Sequence tokens are ignored by CloudWatch now, retry once without one
+                try:
+                    self.client.put_log_events(**kwargs)
+                except Exception as e:
+                    print(f"Error logging to CloudWatch: {str(e)}")
+            except Exception as e:
+                print(f"Error logging to CloudWatch: {str(e)}")
+
+    cloudwatch_batcher = CloudWatchBatcher(logs_client, '/ec2/combined-service', log_stream_name)
+
     # Monkey patch the logger's info, error methods
     original_info = logger.info
     original_error = logger.error
     
     def info_with_cloudwatch(message, *args, **kwargs):
         original_info(message, *args, **kwargs)
-        log_to_cloudwatch(message, "INFO")
+        cloudwatch_batcher.put(message, "INFO")
     
     def error_with_cloudwatch(message, *args, **kwargs):
         original_error(message, *args, **kwargs)
-        log_to_cloudwatch(message, "ERROR")
+        cloudwatch_batcher.put(message, "ERROR")
     
     logger.info = info_with_cloudwatch
     logger.error = error_with_cloudwatch
@@ -97,10 +181,9 @@ except Exception as e:
 
 logger.info("🚀 Combined service logger initialized" + (" with CloudWatch" if cloudwatch_enabled else ""))
 
+import fitz
 from langchain_ollama import ChatOllama
-from langchain_community.document_loaders.parsers.pdf import PyMuPDFParser
-from langchain_core.document_loaders.blob_loaders import Blob
-from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage, SystemMessage
 
 if os.environ.get("DEV_MODE", "False").lower() == "true":
     os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -111,40 +194,176 @@ SQS_QUEUE_URL = os.environ.get('SQS_QUEUE_URL', 'https://sqs.us-east-1.amazonaws
 COOLDOWN_MINUTES = int(os.environ.get('COOLDOWN_MINUTES', '10'))
 MAX_IDLE_TIME = int(os.environ.get('MAX_IDLE_TIME', '30'))
 MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '5'))
+# Seconds a received message stays hidden, kept extended by a heartbeat while its task is in flight
+VISIBILITY_TIMEOUT = int(os.environ.get('VISIBILITY_TIMEOUT', '900'))
+VISIBILITY_HEARTBEAT_SECONDS = 60
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'PaperSummaries')
+# Stop extracting after this many pages (0 extracts the whole document)
+MAX_PAGES = int(os.environ.get('MAX_PAGES', '0'))
+# Worker processes used to extract page text in parallel
+EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', str(os.cpu_count() or 1)))
+# Smallest page range worth handing to a separate worker process
+MIN_PAGES_PER_WORKER = 8
+
+# Characters dropped from the text prefix when building a hash_string
+HASH_STRIP_TABLE = str.maketrans('', '', ' \n\r')
+
+# Serializes summarizations so the GPU only ever works on one paper at a time
+GPU_SEMAPHORE = threading.Semaphore(1)
+# Papers longer than this many characters are summarized chunk by chunk (map-reduce)
+CHUNK_CHARS = int(os.environ.get('CHUNK_CHARS', '32000'))
+# Concurrent Ollama requests while summarizing the chunks of one paper
+MAP_CONCURRENCY = int(os.environ.get('MAP_CONCURRENCY', '4'))
+
+# 4-bit quantized weights, set OLLAMA_MODEL=llama3.2:3b-instruct-q8_0 to trade speed for quality
+OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3.2:3b-instruct-q4_K_M')
+# Context window in tokens, sized to fit one CHUNK_CHARS chunk plus the prompt and summary
+NUM_CTX = int(os.environ.get('NUM_CTX', '12288'))
+
+# keep_alive=-1 keeps the model loaded in Ollama between tasks
+LLM_OPTIONS = dict(
+    model=OLLAMA_MODEL,
+    temperature=0,
+    num_ctx=NUM_CTX,
+    keep_alive=-1
+)
+# One client for the whole process, only its sync client is shared across tasks
+LLM = ChatOllama(**LLM_OPTIONS)
+
+# Static system prompts are identical across calls, so Ollama can reuse their cached prefix
+SYSTEM_MSG = SystemMessage(content=(
+    "You are a research assistant. Read the following research paper and write a detailed, comprehensive, and technical summary.\n"
+    "Preserve important terminology, methods, and findings. Be as exhaustive and accurate as possible."
+))
+
+MAP_SYSTEM_MSG = SystemMessage(content=(
+    "You are a research assistant. You will be given one part of a research paper. Write a detailed and technical summary of this part.\n"
+    "Preserve important terminology, methods, and findings."
+))
+
+REDUCE_SYSTEM_MSG = SystemMessage(content=(
+    "You are a research assistant. You will be given summaries of consecutive parts of one research paper. "
+    "Combine them into a single detailed, comprehensive, and technical summary of the whole paper.\n"
+    "Preserve important terminology, methods, and findings. Be as exhaustive and accurate as possible."
+))
+
+# Summary uploads to S3 are not needed for correctness, so they run in the background
+S3_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# glibc's malloc_trim hands freed heap pages back to the OS between large tasks
+try:
+    LIBC = ctypes.CDLL("libc.so.6")
+except OSError:
+    LIBC = None
+
+# Shared HTTP session so consecutive PDF downloads reuse pooled TLS connections
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+))
 
 app = FastAPI()
 task_processor = None
 
 logger.info("🚀 Starting Combined PDF Summarizer and Task Processor Service")
 
-class BytesIOPyMuPDFLoader:
-    def __init__(self, pdf_stream: BytesIO, *, extract_images: bool = False, **kwargs) -> None:
-        self.pdf_stream = pdf_stream
-        self.extract_images = extract_images
-        self.text_kwargs = kwargs
+def release_memory():
+    """Collect garbage and return freed heap memory to the OS after a large task."""
+    gc.collect()
+    if LIBC is not None:
+        LIBC.malloc_trim(0)
 
-    def load(self, **kwargs) -> List[Document]:
-        blob = Blob.from_data(self.pdf_stream.getvalue(), path="stream")
-        parser = PyMuPDFParser(text_kwargs=self.text_kwargs, extract_images=self.extract_images)
-        return parser.parse(blob)
-
-def download_pdf(url: str) -> bytes:
+def download_pdf(url: str) -> str:
+    """Stream the PDF at url into a temporary file and return its path."""
     logger.info(f"📥 Downloading PDF from: {url}")
     start_time = time.time()
-    response = requests.get(url)
-    if response.status_code != 200:
-        logger.error(f"❌ Failed to download PDF: {url}")
-        raise RuntimeError(f"Failed to download PDF: {url}")
-    logger.info(f"✅ PDF downloaded in {time.time() - start_time:.2f}s, size: {len(response.content)} bytes")
-    return response.content
-
-def extract_entire_text(pdf_bytes: bytes) -> str:
+    with SESSION.get(url, stream=True, timeout=(5, 60)) as response:
+        if response.status_code != 200:
+            logger.error(f"❌ Failed to download PDF: {url}")
+            raise RuntimeError(f"Failed to download PDF: {url}")
+        response.raw.decode_content = True
+        expected_size = int(response.headers.get('Content-Length', 0))
+        if response.headers.get('Content-Encoding'):
+            # Content-Length is the encoded size, not the size written to disk
+            expected_size = 0
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as pdf_file:
+            try:
+                if expected_size and hasattr(os, 'posix_fallocate'):
+                    # Reserve the whole file up front instead of growing it chunk by chunk
+                    try:
+                        os.posix_fallocate(pdf_file.fileno(), 0, expected_size)
+                    except OSError:
+                        # Not supported by every filesystem, the copy grows the file as before
+                        pass
+                shutil.copyfileobj(response.raw, pdf_file, length=1 << 20)
+                size = pdf_file.tell()
+                if expected_size and size != expected_size:
+                    # A truncated PDF would send MuPDF down its slow repair path
+                    raise RuntimeError(f"Incomplete PDF download: got {size} of {expected_size} bytes from {url}")
+            except Exception:
+                os.unlink(pdf_file.name)
+                raise
+    logger.info(f"✅ PDF downloaded in {time.time() - start_time:.2f}s, size: {size} bytes")
+    return pdf_file.name
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) using a Document private to the caller."""
+    # MuPDF reads the file lazily, so only the pages being parsed stay resident
+    doc = fitz.open(pdf_path)
+    parts = []
+    try:
+        for number in range(start, stop):
+            # Plain text flags leave out image blocks, so no image data is decoded
+            textpage = doc[number].get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+            parts.append(textpage.extractText())
+            textpage = None
+    finally:
+        doc.close()
+    return parts
+
+# PyMuPDF is not thread-safe, so large documents are extracted by worker processes. The pool
+# lives as long as the service and is forked here, while the process is still single-threaded:
+# a fork made later from the prefetch thread could copy a lock held by another thread
+EXTRACT_POOL = None
+if EXTRACT_WORKERS > 1:
+    EXTRACT_POOL = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("fork"))
+    # The first submit forks every worker now instead of on the first large document
+    EXTRACT_POOL.submit(int).result()
+
+if cloudwatch_enabled:
+    cloudwatch_batcher.start()
+
+def extract_entire_text(pdf_path: str) -> str:
+    """Extract the text of the PDF at pdf_path, deleting the file afterwards."""
     logger.info("🔍 Extracting text from PDF")
     start_time = time.time()
-    loader = BytesIOPyMuPDFLoader(BytesIO(pdf_bytes))
-    pages = loader.load()
-    text = "\n\n".join(page.page_content for page in pages)
+    try:
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+        if MAX_PAGES and page_count > MAX_PAGES:
+            logger.info(f"✂️ Stopping extraction at page cap of {MAX_PAGES} pages")
+            page_count = MAX_PAGES
+
+        # Large documents are split into contiguous page ranges, each extracted by a pool
+        # worker that opens its own Document
+        workers = max(1, min(EXTRACT_WORKERS, page_count // MIN_PAGES_PER_WORKER))
+        parts = None
+        if workers > 1 and EXTRACT_POOL is not None:
+            step = -(-page_count // workers)
+            starts = list(range(0, page_count, step))
+            stops = [min(start + step, page_count) for start in starts]
+            try:
+                parts = [text for chunk in EXTRACT_POOL.map(extract_page_range, [pdf_path] * len(starts), starts, stops) for text in chunk]
+            except BrokenProcessPool as e:
+                # A dead worker breaks the pool for good, it cannot be re-forked safely now
+                logger.error(f"❌ Extraction pool unavailable, extracting in process: {str(e)}")
+        if parts is None:
+            parts = extract_page_range(pdf_path, 0, page_count)
+    finally:
+        os.unlink(pdf_path)
+    text = "\n\n".join(parts)
     logger.info(f"✅ Text extracted in {time.time() - start_time:.2f}s, extracted {len(text)} characters")
     return text
 
@@ -154,30 +373,69 @@ def generate_hash_string(text: str, char_limit: int = 50) -> str:
     if len(text) < char_limit:
         char_limit = len(text)
     
-    # Remove both spaces and newline characters, then convert to lowercase
-    clean_text = text[:char_limit].replace(" ", "").replace("\n", "").replace("\r", "").lower()
+    # Remove both spaces and newline characters in one pass, then convert to lowercase
+    clean_text = text[:char_limit].translate(HASH_STRIP_TABLE).lower()
     logger.info(f"🔑 Generated hash string from first {char_limit} characters")
     return clean_text
 
+def split_into_chunks(text: str, chunk_chars: int) -> List[str]:
+    """Split text into chunks of at most chunk_chars characters, preferring paragraph breaks."""
+    chunks = []
+    start = 0
+    while len(text) - start > chunk_chars:
+        end = text.rfind("\n\n", start, start + chunk_chars)
+        if end <= start:
+            end = start + chunk_chars
+        chunks.append(text[start:end])
+        start = end
+    chunks.append(text[start:])
+    return chunks
+
+async def map_reduce_summary(llm: ChatOllama, chunks: List[str]) -> str:
+    semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+
+    async def ask(system_msg: SystemMessage, content: str) -> str:
+        async with semaphore:
+            result = await llm.ainvoke([system_msg, HumanMessage(content=content)])
+        return result.content if hasattr(result, "content") else str(result)
+
+    def reduce_prompt(summaries: str) -> str:
+        return f"--- START OF PART SUMMARIES ---\n{summaries}\n--- END OF PART SUMMARIES ---"
+
+    partials = await asyncio.gather(*(
+        ask(MAP_SYSTEM_MSG, f"Part {i + 1} of {len(chunks)}\n\n--- START OF PART ---\n{chunk}\n--- END OF PART ---")
+        for i, chunk in enumerate(chunks)
+    ))
+
+    # Reduce in rounds so no single reduce prompt outgrows the NUM_CTX window
+    groups = split_into_chunks("\n\n".join(partials), CHUNK_CHARS)
+    while len(groups) > 1:
+        partials = await asyncio.gather(*(ask(REDUCE_SYSTEM_MSG, reduce_prompt(group)) for group in groups))
+        next_groups = split_into_chunks("\n\n".join(partials), CHUNK_CHARS)
+        if len(next_groups) >= len(groups):
+            # The summaries stopped shrinking, combine what there is rather than loop forever
+            groups = ["\n\n".join(partials)]
+            break
+        groups = next_groups
+    return await ask(REDUCE_SYSTEM_MSG, reduce_prompt(groups[0]))
+
 def summarize_whole_text(text: str) -> str:
     logger.info("🤖 Summarizing with Ollama")
     start_time = time.time()
 
-    llm = ChatOllama(
-        model="llama3.2:latest",
-        temperature=0
-    )
-
-    prompt = f"""
-You are a research assistant. Read the following research paper and write a detailed, comprehensive, and technical summary.
-Preserve important terminology, methods, and findings. Be as exhaustive and accurate as possible.
-
---- START OF PAPER ---
-{text}
---- END OF PAPER ---
-"""
-    result = llm.invoke(prompt)
-    summary = result.content if hasattr(result, "content") else str(result)
+    chunks = split_into_chunks(text, CHUNK_CHARS)
+    with GPU_SEMAPHORE:
+        if len(chunks) == 1:
+            result = LLM.invoke([
+                SYSTEM_MSG,
+                HumanMessage(content=f"--- START OF PAPER ---\n{text}\n--- END OF PAPER ---")
+            ])
+            summary = result.content if hasattr(result, "content") else str(result)
+        else:
+            # Too long for one context window, summarize the parts concurrently then combine
+            logger.info(f"🧩 Split paper into {len(chunks)} chunks for map-reduce summarization")
+            # A fresh client per run, the async client is bound to the event loop it first runs on
+            summary = asyncio.run(map_reduce_summary(ChatOllama(**LLM_OPTIONS), chunks))
     logger.info(f"✅ Summarization completed in {time.time() - start_time:.2f}s, summary length: {len(summary)} chars")
     return summary
 
@@ -185,8 +443,8 @@ Preserve important terminology, methods, and findings. Be as exhaustive and accu
 def summarize(pdf_url: str = Query(..., description="URL of the PDF")):
     logger.info(f"📋 Received summarization request for: {pdf_url}")
     try:
-        pdf_bytes = download_pdf(pdf_url)
-        full_text = extract_entire_text(pdf_bytes)
+        pdf_path = download_pdf(pdf_url)
+        full_text = extract_entire_text(pdf_path)
         summary = summarize_whole_text(full_text)
         return {"summary": summary.strip()}
     except Exception as e:
@@ -217,7 +475,7 @@ def queue_status():
             "in_flight_messages": int(response['Attributes']['ApproximateNumberOfMessagesNotVisible']),
             "local_queue_size": len(task_processor.task_queue),
             "is_processing": task_processor.is_processing,
-            "cooldown_active": task_processor.cooldown_timer is not None and task_processor.cooldown_timer.is_alive(),
+            "cooldown_active": task_processor.cooldown_deadline is not None,
             "last_activity": task_processor.last_activity_time.isoformat()
         }
     except Exception as e:
@@ -227,29 +485,70 @@ class GPUTaskProcessor:
     def __init__(self):
         self.sqs = boto3.client('sqs', region_name='us-east-1')
         self.dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        self.s3 = boto3.client('s3', region_name='us-east-1')
         self.table = self.dynamodb.Table(DYNAMODB_TABLE)
-        self.task_queue = []
+        self.task_queue = deque()
+        self.task_ready = threading.Semaphore(0)
+        self.prefetch_q = queue.Queue(maxsize=2)
+        self.pending_tasks = 0
+        self._pending_deletes = []
+        self.in_flight = set()
+        self.in_flight_lock = threading.Lock()
         self.is_processing = False
         self.last_activity_time = datetime.now()
-        self.cooldown_timer = None
+        self.cooldown_deadline = None
         self.shutdown_requested = False
 
-        self.shutdown_monitor = threading.Thread(target=self._monitor_idle_time)
-        self.shutdown_monitor.daemon = True
-        self.shutdown_monitor.start()
+        self.prefetch_thread = threading.Thread(target=self._prefetch_loop)
+        self.prefetch_thread.daemon = True
+        self.prefetch_thread.start()
+
+        # SQS polling and the idle/cooldown checks share one asyncio loop on this thread
+        self.scheduler_thread = threading.Thread(target=asyncio.run, args=(self._scheduler_main(),))
+        self.scheduler_thread.daemon = True
+        self.scheduler_thread.start()
 
-        self.processing_thread = threading.Thread(target=self._processing_loop)
-        self.processing_thread.daemon = True
-        self.processing_thread.start()
+    async def _scheduler_main(self):
+        await asyncio.gather(self._processing_loop(), self._idle_watchdog(), self._visibility_heartbeat())
 
-    def _monitor_idle_time(self):
+    async def _visibility_heartbeat(self):
+        # A batch is received at once but processed one paper at a time, so keep every
+        # unfinished message hidden instead of letting SQS redeliver it mid-batch
+        loop = asyncio.get_running_loop()
+        while not self.shutdown_requested:
+            await asyncio.sleep(VISIBILITY_HEARTBEAT_SECONDS)
+            await loop.run_in_executor(None, self._extend_visibility)
+
+    def _extend_visibility(self):
+        with self.in_flight_lock:
+            handles = list(self.in_flight)
+        for start in range(0, len(handles), 10):
+            entries = [
+                {'Id': str(i), 'ReceiptHandle': rh, 'VisibilityTimeout': VISIBILITY_TIMEOUT}
+                for i, rh in enumerate(handles[start:start + 10])
+            ]
+            try:
+                response = self.sqs.change_message_visibility_batch(
+                    QueueUrl=SQS_QUEUE_URL,
+                    Entries=entries
+                )
+                for failure in response.get('Failed', []):
+                    logger.error(f"❌ Error extending message visibility: {failure.get('Code')} {failure.get('Message', '')}")
+            except Exception as e:
+                logger.error(f"❌ Error extending message visibility in SQS: {str(e)}")
+
+    async def _idle_watchdog(self):
         while not self.shutdown_requested:
             idle_minutes = (datetime.now() - self.last_activity_time).total_seconds() / 60
             if idle_minutes > MAX_IDLE_TIME:
                 logger.info(f"Maximum idle time ({MAX_IDLE_TIME} minutes) reached. Initiating shutdown.")
                 self._shutdown_instance()
                 break
-            time.sleep(60)
+            if self.cooldown_deadline is not None and not self.is_processing and time.time() >= self.cooldown_deadline:
+                logger.info(f"Cooldown of {COOLDOWN_MINUTES} minutes elapsed without new tasks. Initiating shutdown.")
+                self._shutdown_instance()
+                break
+            await asyncio.sleep(60)
 
     def _shutdown_instance(self):
         logger.info("🛑 Shutting down instance...")
@@ -260,32 +559,34 @@ class GPUTaskProcessor:
             logger.error(f"❌ Error using system shutdown: {str(shutdown_error)}")
 
     def _reset_cooldown_timer(self):
-        if self.cooldown_timer is not None:
-            self.cooldown_timer.cancel()
-
-        self.cooldown_timer = threading.Timer(
-            COOLDOWN_MINUTES * 60,
-            self._shutdown_instance
-        )
-        self.cooldown_timer.daemon = True
-        self.cooldown_timer.start()
+        # Checked by _idle_watchdog, which never shuts down while a batch is processing
+        self.cooldown_deadline = time.time() + COOLDOWN_MINUTES * 60
         logger.info(f"⏲️ Cooldown timer set for {COOLDOWN_MINUTES} minutes")
 
-    def _processing_loop(self):
+    async def _processing_loop(self):
         logger.info("🔄 Task processing loop started")
+        loop = asyncio.get_running_loop()
         while not self.shutdown_requested:
-            has_messages = self.fetch_tasks()
-            if not has_messages:
-                time.sleep(20)
+            # Receiving and summarizing are blocking, so they run on the default executor.
+            # An empty receive already waited out the 20s long poll, so loop straight back
+            await loop.run_in_executor(None, self.fetch_tasks)
         logger.info("🛑 Task processing loop stopped")
 
+    def _prefetch_loop(self):
+        # Downloads and extracts upcoming PDFs while the GPU summarizes the current one
+        while not self.shutdown_requested:
+            self.task_ready.acquire()
+            task = self.task_queue.popleft()
+            self.prefetch_q.put(self.prepare_task(task))
+
     def fetch_tasks(self):
         try:
             response = self.sqs.receive_message(
                 QueueUrl=SQS_QUEUE_URL,
                 MaxNumberOfMessages=MAX_BATCH_SIZE,
-                VisibilityTimeout=600,
-                WaitTimeSeconds=10
+                MessageAttributeNames=['All'],
+                VisibilityTimeout=VISIBILITY_TIMEOUT,
+                WaitTimeSeconds=20
             )
 
             messages = response.get('Messages', [])
@@ -296,7 +597,12 @@ class GPUTaskProcessor:
                 tasks = []
                 for message in messages:
                     try:
-                        body = json.loads(message.get('Body', '{}'))
+                        attributes = message.get('MessageAttributes')
+                        if attributes:
+                            body = {k: v['StringValue'] for k, v in attributes.items()}
+                        else:
+                            # Messages enqueued before task fields moved into attributes
+                            body = json.loads(message.get('Body', '{}'))
                         tasks.append({
                             'arxiv_id': body.get('arxiv_id'),
                             'pdf_url': body.get('pdf_url'),
@@ -315,10 +621,17 @@ class GPUTaskProcessor:
 
         except Exception as e:
             logger.error(f"❌ Error fetching messages from SQS: {str(e)}")
+            # Errors return immediately, back off so the loop does not spin against SQS
+            time.sleep(20)
             return False
 
     def add_tasks(self, tasks: List[Dict[str, Any]]):
+        with self.in_flight_lock:
+            self.in_flight.update(t['receipt_handle'] for t in tasks if t.get('receipt_handle'))
         self.task_queue.extend(tasks)
+        self.pending_tasks += len(tasks)
+        for _ in tasks:
+            self.task_ready.release()
         logger.info(f"📋 Added {len(tasks)} tasks to queue. Queue size: {len(self.task_queue)}")
 
         if not self.is_processing:
@@ -330,21 +643,74 @@ class GPUTaskProcessor:
             return
 
         self.is_processing = True
-        while self.task_queue and not self.shutdown_requested:
-            task = self.task_queue.pop(0)
+        while self.pending_tasks > 0 and not self.shutdown_requested:
+            prepared = self.prefetch_q.get()
+            self.pending_tasks -= 1
+            task = prepared['task']
             try:
                 logger.info(f"⚙️ Processing task {task.get('task_id')}")
-                self.process_single_task(task)
+                self.process_single_task(prepared)
             except Exception as e:
                 logger.error(f"❌ Error processing task {task.get('task_id')}: {str(e)}")
+            receipt_handle = task.get('receipt_handle')
+            if receipt_handle not in self._pending_deletes:
+                # Failed tasks are left for SQS to redeliver, deleted ones stay hidden until _flush_deletes
+                with self.in_flight_lock:
+                    self.in_flight.discard(receipt_handle)
             self.last_activity_time = datetime.now()
 
+        self._flush_deletes()
         self.is_processing = False
         if not self.shutdown_requested:
             self._reset_cooldown_timer()
 
-    def process_single_task(self, task: Dict[str, Any]):
-        """Process a single PDF summarization task and save result to DynamoDB"""
+    def prepare_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Download a task's PDF and extract its text and hash_string ahead of summarization"""
+        prepared = {'task': task, 'full_text': None, 'hash_string': None, 'error': None, 'already_summarized': False}
+        pdf_url = task.get('pdf_url')
+        arxiv_id = task.get('arxiv_id')
+
+        # Invalid tasks are rejected by process_single_task
+        if not pdf_url or not arxiv_id:
+            return prepared
+
+        if self._has_summary(arxiv_id):
+            prepared['already_summarized'] = True
+            return prepared
+
+        # The enqueue Lambda already marked the item as processing
+        try:
+            pdf_path = download_pdf(pdf_url)
+            full_text = extract_entire_text(pdf_path)
+            
+            # Generate hash_string from first 100 characters
+            hash_string = generate_hash_string(full_text, 50)
+            logger.info(f"🔑 Generated hash string for arxiv_id {arxiv_id}")
+
+            prepared['full_text'] = full_text
+            prepared['hash_string'] = hash_string
+        except Exception as e:
+            prepared['error'] = e
+
+        return prepared
+
+    def _has_summary(self, arxiv_id: str) -> bool:
+        """Check whether a duplicate enqueue already got its summary written"""
+        try:
+            response = self.table.get_item(
+                Key={'arxiv_id': arxiv_id},
+                ProjectionExpression='#sum, #err',
+                ExpressionAttributeNames={'#sum': 'summary', '#err': 'processing_error'}
+            )
+            item = response.get('Item', {})
+            return bool(item.get('summary')) and not item.get('processing_error')
+        except Exception as dynamo_error:
+            logger.error(f"❌ Error checking DynamoDB for existing summary: {str(dynamo_error)}")
+            return False
+
+    def process_single_task(self, prepared: Dict[str, Any]):
+        """Summarize a prepared PDF task and save result to DynamoDB"""
+        task = prepared['task']
         pdf_url = task.get('pdf_url')
         task_id = task.get('task_id', datetime.now().strftime('%Y%m%d%H%M%S'))
         arxiv_id = task.get('arxiv_id')
@@ -359,52 +725,36 @@ class GPUTaskProcessor:
             self._delete_message(task.get('receipt_handle'))
             return
 
+        if prepared['already_summarized']:
+            logger.info(f"⏭️ arxiv_id {arxiv_id} already has a summary, skipping duplicate task")
+            self._delete_message(task.get('receipt_handle'))
+            return
+
         try:
-            # First update the DynamoDB item to mark it as processing
-            try:
-                self.table.update_item(
-                    Key={'arxiv_id': arxiv_id},
-                    UpdateExpression="SET processing = :proc",
-                    ExpressionAttributeValues={':proc': True}
-                )
-                logger.info(f"🔄 Updated DynamoDB: marked arxiv_id {arxiv_id} as processing")
-            except Exception as dynamo_error:
-                logger.error(f"❌ Error updating DynamoDB (processing start): {str(dynamo_error)}")
+            # Download or extraction failed in the prefetch stage
+            if prepared['error'] is not None:
+                raise prepared['error']
+
+            full_text = prepared['full_text']
 
-            # Process PDF as before
-            pdf_bytes = download_pdf(pdf_url)
-            full_text = extract_entire_text(pdf_bytes)
-            
-            # Generate hash_string from first 100 characters
-            hash_string = generate_hash_string(full_text, 50)
-            logger.info(f"🔑 Generated hash string for arxiv_id {arxiv_id}")
-            
-            # Update DynamoDB with hash_string
-            try:
-                self.table.update_item(
-                    Key={'arxiv_id': arxiv_id},
-                    UpdateExpression="SET hash_string = :hash",
-                    ExpressionAttributeValues={':hash': hash_string}
-                )
-                logger.info(f"📝 Updated DynamoDB: added hash_string for arxiv_id {arxiv_id}")
-            except Exception as dynamo_error:
-                logger.error(f"❌ Error updating DynamoDB (hash_string): {str(dynamo_error)}")
-            
             # Now run summarization
             summary = summarize_whole_text(full_text)
             logger.info(f"✅ Successfully summarized PDF for arxiv_id {arxiv_id}")
 
-            # Update DynamoDB with the summary
+            # Write summary and hash_string and clear the processing state in one update
             try:
                 self.table.update_item(
                     Key={'arxiv_id': arxiv_id},
-                    UpdateExpression="SET summary = :sum, processing = :proc",
+                    UpdateExpression="SET summary = :sum, hash_string = :hash, processing = :proc, processing_error = :err",
                     ExpressionAttributeValues={
-                        ':sum': summary,
-                        ':proc': False
+                        # Stored zlib-compressed, the lambdas decompress it before returning items
+                        ':sum': zlib.compress(summary.encode('utf-8')),
+                        ':hash': prepared['hash_string'],
+                        ':proc': False,
+                        ':err': ''
                     }
                 )
-                logger.info(f"📤 Updated DynamoDB: added summary for arxiv_id {arxiv_id} and marked as not processing")
+                logger.info(f"📤 Updated DynamoDB: added summary and hash_string for arxiv_id {arxiv_id} and marked as not processing")
             except Exception as dynamo_error:
                 logger.error(f"❌ Error updating DynamoDB (summary): {str(dynamo_error)}")
                 # Try to update just the processing flag
@@ -421,28 +771,12 @@ class GPUTaskProcessor:
                     logger.error(f"❌ Error during recovery update to DynamoDB: {str(recovery_error)}")
 
             # For backwards compatibility, still save to S3 as well
+            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
             try:
-                s3 = boto3.client('s3', region_name='us-east-1')
-                filename = pdf_url.split('/')[-1].split('.')[0] or "document"
-                timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-                s3_key = f"summaries/{filename}_{task_id}_{timestamp}.txt"
-
-                s3.put_object(
-                    Bucket='gpu-testing-bucket',
-                    Key=s3_key,
-                    Body=summary.encode('utf-8'),
-                    ContentType='text/plain',
-                    Metadata={
-                        'source_url': pdf_url,
-                        'task_id': task_id,
-                        'arxiv_id': arxiv_id,
-                        'timestamp': timestamp,
-                        'summary_length': str(len(summary))
-                    }
-                )
-                logger.info(f"📤 Uploaded summary to S3: s3://gpu-testing-bucket/{s3_key}")
-            except Exception as s3_error:
-                logger.error(f"❌ Error uploading to S3: {str(s3_error)}")
+                S3_EXECUTOR.submit(self._upload_summary_s3, summary, pdf_url, task_id, arxiv_id, timestamp)
+            except RuntimeError:
+                # The executor is shut down once shutdown starts, upload inline instead of failing a saved paper
+                self._upload_summary_s3(summary, pdf_url, task_id, arxiv_id, timestamp)
 
             self._delete_message(task.get('receipt_handle'))
 
@@ -461,22 +795,66 @@ class GPUTaskProcessor:
                 logger.info(f"⚠️ Updated DynamoDB: marked arxiv_id {arxiv_id} as not processing with error")
             except Exception as dynamo_error:
                 logger.error(f"❌ Error updating DynamoDB with error state: {str(dynamo_error)}")
+        finally:
+            # Drop the paper text before the next task so RSS stays flat
+            prepared['full_text'] = None
+            release_memory()
 
-    def _delete_message(self, receipt_handle: str):
-        if not receipt_handle:
-            return
+    def _upload_summary_s3(self, summary: str, pdf_url: str, task_id: str, arxiv_id: str, timestamp: str):
         try:
-            self.sqs.delete_message(
-                QueueUrl=SQS_QUEUE_URL,
-                ReceiptHandle=receipt_handle
+            filename = pdf_url.rsplit('/', 1)[-1].split('.', 1)[0] or "document"
+            s3_key = f"summaries/{filename}_{task_id}_{timestamp}.txt"
+
+            self.s3.put_object(
+                Bucket='gpu-testing-bucket',
+                Key=s3_key,
+                Body=summary.encode('utf-8'),
+                ContentType='text/plain',
+                Metadata={
+                    'source_url': pdf_url,
+                    'task_id': task_id,
+                    'arxiv_id': arxiv_id,
+                    'timestamp': timestamp,
+                    'summary_length': str(len(summary))
+                }
             )
-            logger.info("🗑️ Message deleted from queue")
-        except Exception as e:
-            logger.error(f"❌ Error deleting message from SQS: {str(e)}")
+            logger.info(f"📤 Uploaded summary to S3: s3://gpu-testing-bucket/{s3_key}")
+        except Exception as s3_error:
+            logger.error(f"❌ Error uploading to S3: {str(s3_error)}")
+
+    def _delete_message(self, receipt_handle: str):
+        # Deleted together with the rest of the batch by _flush_deletes
+        if receipt_handle:
+            self._pending_deletes.append(receipt_handle)
+
+    def _flush_deletes(self):
+        handles, self._pending_deletes = self._pending_deletes, []
+        # delete_message_batch accepts at most 10 entries per call
+        for start in range(0, len(handles), 10):
+            entries = [{'Id': str(i), 'ReceiptHandle': rh} for i, rh in enumerate(handles[start:start + 10])]
+            try:
+                response = self.sqs.delete_message_batch(
+                    QueueUrl=SQS_QUEUE_URL,
+                    Entries=entries
+                )
+                for failure in response.get('Failed', []):
+                    logger.error(f"❌ Error deleting message from SQS: {failure.get('Code')} {failure.get('Message', '')}")
+                logger.info(f"🗑️ {len(response.get('Successful', []))} messages deleted from queue")
+            except Exception as e:
+                logger.error(f"❌ Error deleting messages from SQS: {str(e)}")
+            # Stop extending visibility only once the delete has been attempted, a failed delete is redelivered
+            with self.in_flight_lock:
+                self.in_flight.difference_update(handles[start:start + 10])
 
 @app.on_event("startup")
 def startup_event():
     global task_processor
+    logger.info("🔥 Warming up Ollama model")
+    try:
+        # Also primes Ollama's prompt cache with the system prompt
+        LLM.invoke([SYSTEM_MSG, HumanMessage(content="ok")])
+    except Exception as e:
+        logger.error(f"❌ Error warming up Ollama model: {str(e)}")
     logger.info("🚀 Initializing GPU Task Processor")
     task_processor = GPUTaskProcessor()
 
@@ -485,6 +863,12 @@ def app_shutdown():
     logger.info("Application shutting down...")
     if task_processor:
         task_processor.shutdown_requested = True
+    # Let in-flight summary uploads finish before the logs are flushed
+    S3_EXECUTOR.shutdown(wait=True)
+    if EXTRACT_POOL is not None:
+        EXTRACT_POOL.shutdown(wait=False)
+    if cloudwatch_enabled:
+        cloudwatch_batcher.flush()
 
 @app.get("/debug/test-shutdown")
 def test_shutdown():
@@ -496,7 +880,7 @@ def test_shutdown():
         return {
             "status": "shutdown_simulated",
             "cooldown_minutes": COOLDOWN_MINUTES,
-            "cooldown_timer_active": task_processor.cooldown_timer is not None,
+            "cooldown_timer_active": task_processor.cooldown_deadline is not None,
             "note": "Real shutdown not triggered, check logs for simulation details"
         }
     else:
@@ -1,30 +1,114 @@
 import json
 import boto3
 import logging
+from botocore.config import Config
+from boto3.dynamodb.types import Binary
 import os
+import time
+import random
+import zlib
+from collections import OrderedDict
 from urllib.parse import parse_qs
 
+# orjson (de)serializes bodies much faster when it is bundled, default=str covers DynamoDB Decimals
+try:
+    import orjson
+
+    def to_json(obj) -> str:
+        return orjson.dumps(obj, default=str).decode()
+
+    from_json = orjson.loads
+except ImportError:
+    def to_json(obj) -> str:
+        return json.dumps(obj, default=str)
+
+    from_json = json.loads
+
 # Configure logging
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
 
-# Initialize AWS clients
-sqs = boto3.client('sqs')
-dynamodb = boto3.resource('dynamodb')
+# Initialize AWS clients once per container, keepalive and a larger pool let warm invocations reuse connections
+BOTO_CONFIG = Config(max_pool_connections=50, tcp_keepalive=True, retries={'mode': 'adaptive', 'max_attempts': 3})
+sqs = boto3.client('sqs', config=BOTO_CONFIG)
+dynamodb = boto3.resource('dynamodb', config=BOTO_CONFIG)
 
 # Configuration
 QUEUE_URL = os.environ.get('SQS_QUEUE_URL', 'https://sqs.us-east-1.amazonaws.com/071214564206/gpu-task-queue')
 TABLE_NAME = os.environ.get('DYNAMO_TABLE_NAME', 'PaperSummaries')
+# Log 1 in N full events at INFO for production diagnostics (0 disables sampling)
+EVENT_LOG_SAMPLE = int(os.environ.get('EVENT_LOG_SAMPLE', '0'))
 table = dynamodb.Table(TABLE_NAME)
 
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
+    'Access-Control-Allow-Methods': 'POST,OPTIONS,GET',  # Added GET to support paper endpoint
+    'Access-Control-Expose-Headers': 'ETag'
+}
+
+# Every container restored from one SnapStart snapshot starts with the same random state
+try:
+    from snapshot_restore_py import register_after_restore
+
+    register_after_restore(random.seed)
+except ImportError:
+    pass
+
+# Constant responses are built once per container, the runtime only serializes them
+PREFLIGHT_RESPONSE = {
+    'statusCode': 200,
+    'headers': CORS_HEADERS,
+    'body': to_json({'message': 'CORS preflight successful'})
+}
+
+# Characters dropped from the text prefix when building a hash_string
+HASH_STRIP_TABLE = str.maketrans('', '', ' \n\r')
+
+# Completed items are kept in memory briefly so repeated check_only polls skip DynamoDB
+ITEM_CACHE_TTL_SECONDS = 5
+ITEM_CACHE_MAX_SIZE = 1024
+item_cache = OrderedDict()
+
+# Columns the handler branches on, enough to decide without the summary or arxivReference
+STATE_PROJECTION = 'arxiv_id, processing, processing_error, task_id'
+
+def build_response(status_code: int, body) -> dict:
+    """Wrap a JSON body in an API Gateway response with the shared CORS headers."""
+    return {'statusCode': status_code, 'headers': CORS_HEADERS, 'body': to_json(body)}
+
+def item_etag(item: dict) -> str:
+    """ETag for check_only polls, every state change rewrites task_id, processing or processing_error."""
+    return f'"{item.get("task_id", "")}:{int(bool(item.get("processing")))}:{int(bool(item.get("processing_error")))}"'
+
+def compress_json(obj) -> bytes:
+    """Compress a value for storage, summary and arxivReference are kept zlib-compressed at rest."""
+    return zlib.compress(to_json(obj).encode('utf-8'))
+
+def expand_item(item: dict) -> dict:
+    """Decompress summary and arxivReference, rows written before compression hold plain values."""
+    if isinstance(item.get('summary'), Binary):
+        item['summary'] = zlib.decompress(item['summary'].value).decode('utf-8')
+    if isinstance(item.get('arxivReference'), Binary):
+        item['arxivReference'] = from_json(zlib.decompress(item['arxivReference'].value))
+    return item
+
+def get_header(event, name: str):
+    """Case-insensitive request header lookup, API Gateway passes headers as the client sent them."""
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
 def generate_hash_string(text: str, char_limit: int = 100) -> str:
     """Generate a hash string from the first N characters of the text."""
     # Take first char_limit characters, remove spaces, newlines, and make lowercase
     if len(text) < char_limit:
         char_limit = len(text)
     
-    # Remove both spaces and newline characters, then convert to lowercase
-    clean_text = text[:char_limit].replace(" ", "").replace("\n", "").replace("\r", "").lower()
+    # Remove both spaces and newline characters in one pass, then convert to lowercase
+    clean_text = text[:char_limit].translate(HASH_STRIP_TABLE).lower()
     logger.info(f"🔑 Generated hash string from first {char_limit} characters")
     return clean_text
 
@@ -32,22 +116,56 @@ def sanitize_arxiv_id(arxiv_id: str) -> str:
     """Remove '/' characters from arXiv ID to make it safe for URLs and DB keys."""
     return arxiv_id.replace("/", "-")
 
+def get_item_cached(arxiv_id: str, use_cache: bool, projection: str = None):
+    """Fetch an item, serving completed items from the in-memory cache when allowed."""
+    if use_cache:
+        cached = item_cache.get(arxiv_id)
+        if cached and cached[0] > time.time():
+            item_cache.move_to_end(arxiv_id)
+            return cached[1]
+
+    if projection:
+        # Partial rows are never cached, the cache only holds full items
+        return table.get_item(Key={'arxiv_id': arxiv_id}, ProjectionExpression=projection).get('Item')
+
+    item = table.get_item(Key={'arxiv_id': arxiv_id}).get('Item')
+    if item:
+        item = expand_item(item)
+
+    # Items still processing or in error change soon, so only completed ones are cached
+    if item and not item.get('processing', False) and not item.get('processing_error'):
+        item_cache[arxiv_id] = (time.time() + ITEM_CACHE_TTL_SECONDS, item)
+        item_cache.move_to_end(arxiv_id)
+        if len(item_cache) > ITEM_CACHE_MAX_SIZE:
+            item_cache.popitem(last=False)
+    return item
+
+# The queue's default VisibilityTimeout should be at least 900s; the GPU worker receives with
+# that timeout and extends it every 60s while a task is in flight, so slow summaries are not redelivered
+def send_task_message(arxiv_id: str, task_id: str, pdf_url: str):
+    """Queue a summarization task, passing its fields as SQS message attributes."""
+    # Attribute values cannot be empty, the GPU worker treats a missing field as unset
+    fields = {'arxiv_id': arxiv_id, 'task_id': task_id, 'pdf_url': pdf_url}
+    sqs.send_message(
+        QueueUrl=QUEUE_URL,
+        MessageBody=arxiv_id,
+        MessageAttributes={
+            k: {'DataType': 'String', 'StringValue': v}
+            for k, v in fields.items() if v
+        }
+    )
+
 def lambda_handler(event, context):
-    logger.info(f"Received event: {json.dumps(event)}")
-    cors_headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-        'Access-Control-Allow-Methods': 'POST,OPTIONS,GET'  # Added GET to support paper endpoint
-    }
+    # The full event is several KB, only format it when it is actually logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received event: %s", event)
+    elif EVENT_LOG_SAMPLE and random.randrange(EVENT_LOG_SAMPLE) == 0:
+        logger.info("Received event: %s", event)
     arxiv_obj = None
 
     # Handle OPTIONS method for CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': cors_headers,
-            'body': json.dumps({'message': 'CORS preflight successful'})
-        }
+        return PREFLIGHT_RESPONSE
 
     # Check if this is a "check_only" request
     check_only = False
@@ -55,14 +173,14 @@ def lambda_handler(event, context):
     # Extract body JSON
     if 'body' in event and event['body']:
         try:
-            arxiv_obj = json.loads(event['body'])
+            arxiv_obj = from_json(event['body'])
             check_only = arxiv_obj.get('check_only', False)
         except json.JSONDecodeError:
             logger.error("Invalid JSON body")
-            return {'statusCode': 400, 'headers': cors_headers, 'body': json.dumps({'error': 'Invalid JSON'})}
+            return build_response(400, {'error': 'Invalid JSON'})
 
     if not arxiv_obj or 'arxiv_id' not in arxiv_obj:
-        return {'statusCode': 400, 'headers': cors_headers, 'body': json.dumps({'error': 'Missing arxiv_id'})}
+        return build_response(400, {'error': 'Missing arxiv_id'})
 
     # Sanitize the arXiv ID by removing '/' characters
     original_arxiv_id = arxiv_obj['arxiv_id']
@@ -74,116 +192,126 @@ def lambda_handler(event, context):
     summary = arxiv_obj.get('summary', '')
     hash_string = "not_set_yet"#generate_hash_string(summary) if summary else 'nosummary'
 
-    # Check if item already exists
     try:
-        response = table.get_item(Key={'arxiv_id': arxiv_id})
-        item = response.get('Item')
+        # New submissions try to create the item straight away, the conditional put
+        # only fails when the arxiv_id exists and then falls back to reading it
+        if not check_only:
+            # For ensuring the original arXiv ID is preserved in the reference
+            if 'arxiv_id' in arxiv_obj:
+                arxiv_obj['original_arxiv_id'] = arxiv_obj['arxiv_id']
+                arxiv_obj['arxiv_id'] = arxiv_id
+
+            new_item = {
+                'arxiv_id': arxiv_id,
+                'hash_string': hash_string,  # Using the generated hash string
+                'processing': True,
+                'task_id': task_id,
+                'processing_error': '',
+                'summary': '',
+                'pdf_url': pdf_url,
+                'manual_upload': False,
+                'arxivReference': compress_json(arxiv_obj)
+            }
+
+            try:
+                table.put_item(Item=new_item, ConditionExpression='attribute_not_exists(arxiv_id)')
+                item_cache.pop(arxiv_id, None)
+                logger.info(f"No entry found. Created new entry for arxiv_id: {arxiv_id}")
+
+                # Sent only once the conditional put has succeeded, sending it alongside the put
+                # would queue duplicate work whenever the arxiv_id already exists
+                send_task_message(arxiv_id, task_id, pdf_url)
+
+                return build_response(200, {'message': 'New task enqueued', 'task_id': task_id})
+            except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+                pass
+
+        # Check the existing item, check_only polls may be answered from the cache. Conditional
+        # polls and submissions for existing rows usually only need the state columns, the
+        # full row is fetched only when it is returned
+        if_none_match = get_header(event, 'If-None-Match') if check_only else None
+        projected = not check_only or if_none_match is not None
+        item = get_item_cached(arxiv_id, use_cache=check_only, projection=STATE_PROJECTION if projected else None)
         
         if item:
             logger.info(f"Found existing entry for arxiv_id: {arxiv_id}")
             
-            # If check_only is True, return the existing item with additional metadata
+            # If check_only is True, return the existing item with additional metadata,
+            # or an empty 304 when the poller already has this state
             if check_only:
-                return {
-                    'statusCode': 200, 
-                    'headers': cors_headers, 
-                    'body': json.dumps({
-                        **item,
-                        'exists': True,
-                        'processing': item.get('processing', False)
-                    })
-                }
+                etag = item_etag(item)
+                if if_none_match == etag:
+                    return {'statusCode': 304, 'headers': {**CORS_HEADERS, 'ETag': etag}, 'body': ''}
+                if projected:
+                    item = get_item_cached(arxiv_id, use_cache=check_only) or item
+                response = build_response(200, {
+                    **item,
+                    'exists': True,
+                    'processing': item.get('processing', False)
+                })
+                response['headers'] = {**CORS_HEADERS, 'ETag': item_etag(item)}
+                return response
             
             # If already summarized, return the summary
             if not item.get('processing', False) and not item.get('processing_error'):
-                return {'statusCode': 200, 'headers': cors_headers, 'body': json.dumps(item)}
+                if projected:
+                    item = get_item_cached(arxiv_id, use_cache=check_only) or item
+                return build_response(200, item)
 
             # If processing error, re-enqueue
             elif not item.get('processing', False) and item.get('processing_error'):
                 # Don't re-enqueue if this is just a check
                 if check_only:
-                    return {
-                        'statusCode': 200,
-                        'headers': cors_headers,
-                        'body': json.dumps({
-                            'exists': True,
-                            'processing': False,
-                            'processing_error': item.get('processing_error', ''),
-                            'message': 'Previous processing error'
-                        })
-                    }
+                    return build_response(200, {
+                        'exists': True,
+                        'processing': False,
+                        'processing_error': item.get('processing_error', ''),
+                        'message': 'Previous processing error'
+                    })
                 
                 logger.info(f"Re-enqueueing arxiv_id {arxiv_id} due to error: {item['processing_error']}")
-                sqs.send_message(QueueUrl=QUEUE_URL, MessageBody=json.dumps({
-                    'arxiv_id': arxiv_id,
-                    'task_id': task_id,
-                    'pdf_url': pdf_url
-                }))
-                return {
-                    'statusCode': 200,
-                    'headers': cors_headers,
-                    'body': json.dumps({'message': 'Re-enqueued for processing', 'task_id': task_id})
-                }
-
-            # If currently processing
-            elif item.get('processing'):
-                return {
-                    'statusCode': 200,
-                    'headers': cors_headers,
-                    'body': json.dumps({
-                        'message': 'Task already queued', 
-                        'task_id': item.get('task_id'),
+                # The GPU worker no longer marks items itself, so flag the retry as processing here.
+                # The condition makes the transition atomic, only one concurrent retry wins it
+                try:
+                    table.update_item(
+                        Key={'arxiv_id': arxiv_id},
+                        UpdateExpression="SET processing = :proc, processing_error = :err, task_id = :tid",
+                        ConditionExpression="attribute_exists(arxiv_id) AND processing = :idle AND processing_error <> :err",
+                        ExpressionAttributeValues={':proc': True, ':idle': False, ':err': '', ':tid': task_id},
+                        ReturnValuesOnConditionCheckFailure='ALL_OLD'
+                    )
+                except dynamodb.meta.client.exceptions.ConditionalCheckFailedException as e:
+                    # Another request already re-enqueued it, report the task that won
+                    logger.info(f"arxiv_id {arxiv_id} was already re-enqueued by another request")
+                    return build_response(200, {
+                        'message': 'Task already queued',
+                        'task_id': e.response.get('Item', {}).get('task_id', {}).get('S'),
                         'exists': True,
                         'processing': True
                     })
-                }
-
-        else:
-            logger.info(f"No entry found. Creating new entry for arxiv_id: {arxiv_id}")
-            
-            # If check_only is True, just return that it doesn't exist
-            if check_only:
-                return {
-                    'statusCode': 200,
-                    'headers': cors_headers,
-                    'body': json.dumps({
-                        'exists': False,
-                        'processing': False,
-                        'message': 'No entry found for this arXiv ID'
-                    })
-                }
+                item_cache.pop(arxiv_id, None)
+                send_task_message(arxiv_id, task_id, pdf_url)
+                return build_response(200, {'message': 'Re-enqueued for processing', 'task_id': task_id})
 
-            # For ensuring the original arXiv ID is preserved in the reference
-            if 'arxiv_id' in arxiv_obj:
-                arxiv_obj['original_arxiv_id'] = arxiv_obj['arxiv_id']
-                arxiv_obj['arxiv_id'] = arxiv_id
-
-            new_item = {
-                'arxiv_id': arxiv_id,
-                'hash_string': hash_string,  # Using the generated hash string
-                'processing': True,
-                'task_id': task_id,
-                'processing_error': '',
-                'summary': '',
-                'pdf_url': pdf_url,
-                'manual_upload': False,
-                'arxivReference': arxiv_obj
-            }
-
-            table.put_item(Item=new_item)
+            # If currently processing
+            elif item.get('processing'):
+                return build_response(200, {
+                    'message': 'Task already queued', 
+                    'task_id': item.get('task_id'),
+                    'exists': True,
+                    'processing': True
+                })
 
-            sqs.send_message(QueueUrl=QUEUE_URL, MessageBody=json.dumps({
-                'arxiv_id': arxiv_id,
-                'task_id': task_id,
-                'pdf_url': pdf_url
-            }))
+        else:
+            logger.info(f"No entry found for arxiv_id: {arxiv_id}")
 
-            return {
-                'statusCode': 200,
-                'headers': cors_headers,
-                'body': json.dumps({'message': 'New task enqueued', 'task_id': task_id})
-            }
+            # Only check_only requests get here, new submissions were created above
+            return build_response(200, {
+                'exists': False,
+                'processing': False,
+                'message': 'No entry found for this arXiv ID'
+            })
 
     except Exception as e:
         logger.error(f"Error accessing DynamoDB or sending SQS message: {str(e)}")
-        return {'statusCode': 500, 'headers': cors_headers, 'body': json.dumps({'error': str(e)})}
+        return build_response(500, {'error': str(e)})
@@ -1,16 +1,18 @@
 import json
 import boto3
 import logging
-import time
+from botocore.config import Config
+from botocore.exceptions import WaiterError
 import os
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-sqs = boto3.client('sqs')
-ec2 = boto3.client('ec2')
+# Initialize AWS clients once per container, keepalive and a larger pool let warm invocations reuse connections
+BOTO_CONFIG = Config(max_pool_connections=50, tcp_keepalive=True, retries={'mode': 'adaptive', 'max_attempts': 3})
+sqs = boto3.client('sqs', config=BOTO_CONFIG)
+ec2 = boto3.client('ec2', config=BOTO_CONFIG)
 
 # Get queue URL from environment variable
 SQS_QUEUE_URL = os.environ.get('SQS_QUEUE_URL', 'https://sqs.us-east-1.amazonaws.com/071214564206/gpu-task-queue')
@@ -18,20 +20,26 @@ SQS_QUEUE_URL = os.environ.get('SQS_QUEUE_URL', 'https://sqs.us-east-1.amazonaws
 GPU_INSTANCE_ID = os.environ.get('GPU_INSTANCE_ID', 'i-0e9d9c51f67dfad3a')
 # Maximum polling time in seconds
 MAX_POLLING_TIME = 300
+# Seconds between instance state checks while waiting for the instance to run
+WAITER_DELAY = 5
 
 def lambda_handler(event, context):
     logger.info("Processing SQS event trigger")
     
     try:
-        # Check number of messages in the queue
-        queue_attributes = sqs.get_queue_attributes(
+        # ApproximateNumberOfMessages can lag, so peek at a real message instead. With
+        # VisibilityTimeout=0 it stays visible for the GPU worker and is never deleted here.
+        # Each probe counts as a receive, keep any redrive maxReceiveCount well above it
+        response = sqs.receive_message(
             QueueUrl=SQS_QUEUE_URL,
-            AttributeNames=['ApproximateNumberOfMessages']
+            MaxNumberOfMessages=1,
+            WaitTimeSeconds=1,
+            VisibilityTimeout=0
         )
-        message_count = int(queue_attributes['Attributes']['ApproximateNumberOfMessages'])
-        logger.info(f"Approximate number of messages in queue: {message_count}")
-        
-        if message_count == 0:
+        has_messages = 'Messages' in response
+        logger.info(f"Messages waiting in queue: {has_messages}")
+
+        if not has_messages:
             return {
                 'statusCode': 200,
                 'body': json.dumps({'message': 'No messages in queue'})
@@ -44,6 +52,7 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'GPU_INSTANCE_ID environment variable not set'})
             }
 
+        # Only looked up once there is work, most scheduled ticks find an empty queue
         instance_state = get_instance_state(GPU_INSTANCE_ID)
         logger.info(f"Current GPU instance state: {instance_state}")
 
@@ -83,14 +92,10 @@ def get_instance_state(instance_id):
 
 def wait_for_instance_to_run(instance_id):
     logger.info("Waiting for instance to be in running state")
-    start_time = time.time()
-    current_state = get_instance_state(instance_id)
-
-    while current_state != 'running':
-        if time.time() - start_time > MAX_POLLING_TIME:
-            logger.warning(f"Timed out waiting for instance to start. Current state: {current_state}")
-            break
-
-        logger.info(f"Instance state: {current_state}, waiting...")
-        time.sleep(10)
-        current_state = get_instance_state(instance_id)
+    try:
+        ec2.get_waiter('instance_running').wait(
+            InstanceIds=[instance_id],
+            WaiterConfig={'Delay': WAITER_DELAY, 'MaxAttempts': MAX_POLLING_TIME // WAITER_DELAY}
+        )
+    except WaiterError as e:
+        logger.warning(f"Timed out waiting for instance to start: {str(e)}")
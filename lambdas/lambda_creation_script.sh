@@ -86,7 +86,7 @@ if [[ -z "$ROLE_NAME" ]]; then
 fi
 
 # Get runtime
-RUNTIMES=("python3.9" "python3.10" "python3.11" "nodejs18.x" "nodejs20.x" "java17" "dotnet6")
+RUNTIMES=("python3.9" "python3.10" "python3.11" "python3.12" "nodejs18.x" "nodejs20.x" "java17" "dotnet6")
 echo -e "${BOLD}\nSelect runtime:${NC}"
 select RUNTIME in "${RUNTIMES[@]}"; do
   if [ -n "$RUNTIME" ]; then
@@ -117,6 +117,12 @@ MEMORY_SIZE=${MEMORY_SIZE:-256}
 read -p $'\nEnter timeout in seconds (default: 30): ' TIMEOUT
 TIMEOUT=${TIMEOUT:-30}
 
+# SnapStart restores initialized containers from a snapshot (python3.12+ only)
+ENABLE_SNAPSTART="n"
+if [[ $RUNTIME == python3.1[2-9]* ]]; then
+  read -p $'\nEnable SnapStart to cut cold starts? (y/N): ' ENABLE_SNAPSTART
+fi
+
 # Review configuration
 echo -e "\n${BOLD}=== Deployment Configuration ===${NC}"
 echo -e "AWS Account ID: ${GREEN}$ACCOUNT_ID${NC}"
@@ -128,6 +134,7 @@ echo -e "Runtime: ${GREEN}$RUNTIME${NC}"
 echo -e "Handler: ${GREEN}$HANDLER${NC}"
 echo -e "Memory size: ${GREEN}${MEMORY_SIZE} MB${NC}"
 echo -e "Timeout: ${GREEN}${TIMEOUT} seconds${NC}"
+echo -e "SnapStart: ${GREEN}${ENABLE_SNAPSTART}${NC}"
 
 # Confirmation
 read -p $'\nProceed with deployment? (Y/n): ' confirm
@@ -220,6 +227,19 @@ else
   fi
 fi
 
+# SnapStart only applies to published versions, so enable it and publish one
+if [[ $ENABLE_SNAPSTART == [yY] ]]; then
+  echo "Enabling SnapStart and publishing a version..."
+  aws lambda wait function-updated --region "$REGION" --function-name "$FUNCTION_NAME"
+  aws lambda update-function-configuration \
+    --region "$REGION" \
+    --function-name "$FUNCTION_NAME" \
+    --snap-start ApplyOn=PublishedVersions > /dev/null
+  aws lambda wait function-updated --region "$REGION" --function-name "$FUNCTION_NAME"
+  aws lambda publish-version --region "$REGION" --function-name "$FUNCTION_NAME" --query Version --output text
+  echo -e "${YELLOW}Point the API Gateway integration at the published version or an alias to use the snapshot.${NC}"
+fi
+
 # Clean up temporary files
 rm -f trust-policy.json
 
@@ -1,175 +1,493 @@
+import io
 import os
+import re
 import json
+import time
+import zlib
+import random
+import hashlib
 import logging
+import itertools
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime
 from typing import Optional, List, Dict, Any
-import arxiv
+from collections import OrderedDict
 import boto3
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from botocore.config import Config
 from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import Binary
+
+# orjson (de)serializes bodies much faster when it is bundled, default=str covers DynamoDB Decimals
+try:
+    import orjson
+
+    def to_json(obj) -> str:
+        return orjson.dumps(obj, default=str).decode()
+
+    from_json = orjson.loads
+except ImportError:
+    def to_json(obj) -> str:
+        return json.dumps(obj, default=str)
+
+    from_json = json.loads
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s"
 )
 logger = logging.getLogger(__name__)
+# Per-request logs are DEBUG, set LOG_LEVEL=DEBUG to see them
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource("dynamodb")
+# Initialize DynamoDB client once per container, keepalive and a larger pool let warm invocations reuse connections
+# Standard retries, adaptive mode's client-side rate limiter could sleep on the latency-sensitive search path
+BOTO_CONFIG = Config(max_pool_connections=50, tcp_keepalive=True, retries={"mode": "standard", "max_attempts": 3})
+dynamodb = boto3.resource("dynamodb", config=BOTO_CONFIG)
 TABLE_NAME = os.environ.get("DYNAMO_TABLE_NAME", "PaperSummaries")
+# Log 1 in N full events at INFO for production diagnostics (0 disables sampling)
+EVENT_LOG_SAMPLE = int(os.environ.get("EVENT_LOG_SAMPLE", "0"))
 table = dynamodb.Table(TABLE_NAME)
 
+# Search results are cached in DynamoDB so repeated queries skip the arXiv round-trip
+SEARCH_CACHE_TABLE_NAME = os.environ.get("SEARCH_CACHE_TABLE_NAME", "ArxivSearchCache")
+SEARCH_CACHE_TTL_SECONDS = int(os.environ.get("SEARCH_CACHE_TTL_SECONDS", "3600"))
+search_cache_table = dynamodb.Table(SEARCH_CACHE_TABLE_NAME)
+
+# Completed papers are kept in memory so repeated GETs on warm containers skip DynamoDB
+ITEM_CACHE_TTL_SECONDS = 300
+ITEM_CACHE_MAX_SIZE = 512
+item_cache = OrderedDict()
+
+# Recently missing ids -> (expires_at, confirmed), so repeated polls for unknown ids skip DynamoDB.
+# The frontend GETs a new paper once (404) right before enqueueing it, so a first miss is only
+# remembered and a lookup is skipped only after a repeat miss. Enqueue cannot invalidate this
+# container's entries, so a paper created meanwhile can read as missing for up to the TTL
+MISSING_CACHE_TTL_SECONDS = 5
+MISSING_CACHE_MAX_SIZE = 2048
+missing_cache = OrderedDict()
+
+# hash_string -> arxiv_id for summarized papers only. Enqueue writes a "not_set_yet" placeholder
+# hash_string on new rows, so a mapping is only stable once the worker has saved the summary
+HASH_CACHE_MAX_SIZE = 2048
+hash_cache = OrderedDict()
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_ATTEMPTS = 4
+
+def warm_dynamodb_connection():
+    # A cheap keys-only read during init opens the TLS connection before the first request
+    try:
+        table.get_item(Key={"arxiv_id": "__warmup__"}, ProjectionExpression="arxiv_id")
+    except Exception as e:
+        logger.warning("DynamoDB warmup read failed: %s", e)
+
+# SnapStart snapshots the initialized process, a socket opened during init would be dead after restore
+if os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE") != "snap-start":
+    warm_dynamodb_connection()
+
+# The SnapStart runtime hooks are only bundled with SnapStart-capable runtimes
+try:
+    from snapshot_restore_py import register_after_restore
+
+    @register_after_restore
+    def after_restore():
+        # Every container restored from one snapshot starts with the same random state
+        random.seed()
+        warm_dynamodb_connection()
+except ImportError:
+    pass
+
+# arXiv Atom API, queried directly rather than through the arxiv package
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+ARXIV_NS = "{http://arxiv.org/schemas/atom}"
+ENTRY_TAG = f"{ATOM_NS}entry"
+AUTHOR_TAG = f"{ATOM_NS}author"
+NAME_TAG = f"{ATOM_NS}name"
+CATEGORY_TAG = f"{ATOM_NS}category"
+LINK_TAG = f"{ATOM_NS}link"
+TITLE_TAG = f"{ATOM_NS}title"
+SUMMARY_TAG = f"{ATOM_NS}summary"
+PUBLISHED_TAG = f"{ATOM_NS}published"
+UPDATED_TAG = f"{ATOM_NS}updated"
+ID_TAG = f"{ATOM_NS}id"
+PRIMARY_CATEGORY_TAG = f"{ARXIV_NS}primary_category"
+WHITESPACE_PATTERN = re.compile(r"\s+")
+SORT_BY_PARAMS = {
+    "relevance": "relevance",
+    "submitted_date": "submittedDate",
+    "last_updated": "lastUpdatedDate",
+}
+
+# Built during init, which runs with boosted CPU and is captured by SnapStart, so warm
+# searches reuse the pooled TLS connection to export.arxiv.org
+ARXIV_SESSION = requests.Session()
+ARXIV_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+))
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
+    "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+}
+
+# Constant responses are built once per container, the runtime only serializes them
+HEALTH_RESPONSE = {
+    "statusCode": 200,
+    "headers": CORS_HEADERS,
+    "body": to_json({"status": "healthy", "service": "arxiv-search-lambda"}),
+}
+
+def build_response(status_code: int, body) -> Dict[str, Any]:
+    return {"statusCode": status_code, "headers": CORS_HEADERS, "body": to_json(body)}
+
+def expand_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    # summary and arxivReference are stored zlib-compressed, older rows still hold plain values
+    if isinstance(item.get("summary"), Binary):
+        item["summary"] = zlib.decompress(item["summary"].value).decode("utf-8")
+    if isinstance(item.get("arxivReference"), Binary):
+        item["arxivReference"] = from_json(zlib.decompress(item["arxivReference"].value))
+    return item
+
 def get_dynamo_summary(arxiv_id: str) -> Optional[Dict[str, Any]]:
+    cached = item_cache.get(arxiv_id)
+    if cached and cached[0] > time.time():
+        item_cache.move_to_end(arxiv_id)
+        return cached[1]
+    missing = missing_cache.get(arxiv_id)
+    if missing and missing[1] and missing[0] > time.time():
+        return None
     try:
+        # Papers still processing are answered from the state columns alone, only
+        # finished rows pay for transferring the summary and arxivReference
+        state = table.get_item(
+            Key={"arxiv_id": arxiv_id},
+            ProjectionExpression="arxiv_id, processing, task_id"
+        ).get("Item")
+        if not state:
+            now = time.time()
+            missing_cache[arxiv_id] = (now + MISSING_CACHE_TTL_SECONDS, bool(missing and missing[0] > now))
+            missing_cache.move_to_end(arxiv_id)
+            if len(missing_cache) > MISSING_CACHE_MAX_SIZE:
+                missing_cache.popitem(last=False)
+            return None
+        missing_cache.pop(arxiv_id, None)
+        if state.get("processing", False):
+            return state
+
         response = table.get_item(Key={"arxiv_id": arxiv_id})
         if "Item" in response:
-            return response["Item"]
+            item = expand_item(response["Item"])
+            # Items still processing can change any moment, only finished summaries are cached
+            if not item.get("processing", False) and item.get("summary"):
+                item_cache[arxiv_id] = (time.time() + ITEM_CACHE_TTL_SECONDS, item)
+                item_cache.move_to_end(arxiv_id)
+                if len(item_cache) > ITEM_CACHE_MAX_SIZE:
+                    item_cache.popitem(last=False)
+            return item
         return None
     except Exception as e:
-        logger.error(f"Error getting summary from DynamoDB: {str(e)}")
+        logger.error("Error getting summary from DynamoDB: %s", e)
         return None
 
-def convert_paper_to_dict(paper):
-    return {
-        "title": paper.title,
-        "authors": [author.name for author in paper.authors],
-        "summary": paper.summary,
-        "published": paper.published.isoformat() if paper.published else None,
-        "updated": paper.updated.isoformat() if paper.updated else None,
-        "pdf_url": paper.pdf_url,
-        "arxiv_id": paper.get_short_id(),
-        "primary_category": paper.primary_category,
-        "categories": paper.categories,
+def get_dynamo_summaries(arxiv_ids: List[str]) -> List[Dict[str, Any]]:
+    # One BatchGetItem for the whole list, DynamoDB fetches the keys in parallel server-side
+    request_items = {TABLE_NAME: {
+        "Keys": [{"arxiv_id": arxiv_id} for arxiv_id in dict.fromkeys(arxiv_ids)],
+        "ProjectionExpression": "arxiv_id, processing, processing_error, task_id, #sum",
+        "ExpressionAttributeNames": {"#sum": "summary"},
+    }}
+    items = []
+    for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+        response = dynamodb.batch_get_item(RequestItems=request_items)
+        items.extend(expand_item(item) for item in response.get("Responses", {}).get(TABLE_NAME, []))
+        request_items = response.get("UnprocessedKeys")
+        if not request_items:
+            return items
+        # Throttled keys come back unprocessed, retry them with backoff
+        time.sleep(0.05 * 2 ** attempt)
+    raise RuntimeError(f"{len(request_items[TABLE_NAME]['Keys'])} keys still unprocessed after {BATCH_GET_MAX_ATTEMPTS} attempts")
+
+def parse_atom_timestamp(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).isoformat()
+
+def iter_feed_entries(content: bytes):
+    # Entries are handed out as soon as they are parsed and cleared once the caller moves on
+    for _, elem in ElementTree.iterparse(io.BytesIO(content), events=("end",)):
+        if elem.tag == ENTRY_TAG:
+            yield elem
+            elem.clear()
+
+def convert_paper_to_dict(entry):
+    # One pass over the entry's children instead of a find() scan per field
+    paper = {
+        "title": "0",
+        "authors": [],
+        "summary": "",
+        "published": None,
+        "updated": None,
+        "pdf_url": None,
+        "arxiv_id": "",
+        "primary_category": None,
+        "categories": [],
     }
+    authors = paper["authors"]
+    categories = paper["categories"]
+    for child in entry:
+        tag = child.tag
+        if tag == AUTHOR_TAG:
+            authors.append(child.findtext(NAME_TAG, "").strip())
+        elif tag == CATEGORY_TAG:
+            categories.append(child.get("term"))
+        elif tag == LINK_TAG:
+            if paper["pdf_url"] is None and child.get("title") == "pdf":
+                paper["pdf_url"] = child.get("href")
+        elif tag == TITLE_TAG:
+            paper["title"] = WHITESPACE_PATTERN.sub(" ", child.text or "")
+        elif tag == SUMMARY_TAG:
+            paper["summary"] = (child.text or "").strip()
+        elif tag == PUBLISHED_TAG:
+            paper["published"] = parse_atom_timestamp(child.text)
+        elif tag == UPDATED_TAG:
+            paper["updated"] = parse_atom_timestamp(child.text)
+        elif tag == ID_TAG:
+            paper["arxiv_id"] = (child.text or "").strip().split("arxiv.org/abs/")[-1]
+        elif tag == PRIMARY_CATEGORY_TAG:
+            paper["primary_category"] = child.get("term")
+    return paper
+
+def search_cache_key(query: str, page: int, page_size: int, sort_by: str) -> str:
+    return hashlib.sha1(f"{query}|{page}|{page_size}|{sort_by}".encode("utf-8")).hexdigest()
+
+def get_cached_search(cache_key: str) -> Optional[Dict[str, Any]]:
+    try:
+        response = search_cache_table.get_item(
+            Key={"cache_key": cache_key},
+            ProjectionExpression="payload, #ttl",
+            ExpressionAttributeNames={"#ttl": "ttl"}
+        )
+        item = response.get("Item")
+        # DynamoDB deletes expired items lazily, so check the TTL ourselves
+        if not item or item["ttl"] <= time.time():
+            return None
+        return from_json(zlib.decompress(item["payload"].value))
+    except Exception as e:
+        logger.error("Error reading search cache from DynamoDB: %s", e)
+        return None
+
+def put_cached_search(cache_key: str, result: Dict[str, Any]):
+    try:
+        search_cache_table.put_item(Item={
+            "cache_key": cache_key,
+            "payload": zlib.compress(to_json(result).encode("utf-8")),
+            "ttl": int(time.time()) + SEARCH_CACHE_TTL_SECONDS,
+        })
+    except Exception as e:
+        logger.error("Error writing search cache to DynamoDB: %s", e)
 
 def search_papers(query: str, page: int = 0, page_size: int = 10, sort_by: str = "relevance"):
-    logger.info(f"📋 Received search request: query='{query}', page={page}, page_size={page_size}, sort_by={sort_by}")
-    sort_criterion = arxiv.SortCriterion.Relevance
-    if sort_by == "submitted_date":
-        sort_criterion = arxiv.SortCriterion.SubmittedDate
-    elif sort_by == "last_updated":
-        sort_criterion = arxiv.SortCriterion.LastUpdatedDate
+    logger.debug("📋 Received search request: query='%s', page=%s, page_size=%s, sort_by=%s", query, page, page_size, sort_by)
+    cache_key = search_cache_key(query, page, page_size, sort_by)
+    cached = get_cached_search(cache_key)
+    if cached is not None:
+        logger.debug("✅ Serving cached results for query '%s'", query)
+        return cached
 
     start = page * page_size
-    client = arxiv.Client()
-    search = arxiv.Search(query=query, max_results=page_size + 1, sort_by=sort_criterion)
+    # Fetch the whole window (plus the next-page probe) in a single API request, arXiv's
+    # terms allow one request every 3 seconds so the window is not split across parallel calls
+    params = {
+        "search_query": query,
+        "sortBy": SORT_BY_PARAMS.get(sort_by, "relevance"),
+        "sortOrder": "descending",
+        "start": start,
+        "max_results": page_size + 1,
+    }
 
     try:
-        results = list(client.results(search, offset=start))
-        has_next_page = len(results) > page_size
-        if has_next_page:
-            results = results[:page_size]
-        papers = [convert_paper_to_dict(paper) for paper in results]
-        logger.info(f"✅ Found {len(papers)} papers for query '{query}'")
-        return {
+        response = ARXIV_SESSION.get(ARXIV_API_URL, params=params, timeout=10)
+        response.raise_for_status()
+        # Stop pulling entries once the page is full, the extra result is only checked for existence
+        results = iter_feed_entries(response.content)
+        papers = [convert_paper_to_dict(paper) for paper in itertools.islice(results, page_size)]
+        has_next_page = next(results, None) is not None
+        logger.debug("✅ Found %d papers for query '%s'", len(papers), query)
+        result = {
             "papers": papers,
             "total_results": len(papers) + (page * page_size),
             "page": page,
             "page_size": page_size,
             "has_next_page": has_next_page,
         }
+        # arXiv occasionally returns a spurious empty page, so only cache pages with results
+        if papers:
+            put_cached_search(cache_key, result)
+        return result
     except Exception as e:
-        logger.error(f"❌ Error processing search: {str(e)}")
+        logger.error("❌ Error processing search: %s", e)
         return {"error": str(e)}
 
 def get_paper(paper_id: str):
-    logger.info(f"📋 Received paper request: id='{paper_id}'")
+    logger.debug("📋 Received paper request: id='%s'", paper_id)
     dynamo_data = get_dynamo_summary(paper_id)
     if dynamo_data:
-        if not dynamo_data.get("processing", False) and dynamo_data.get("summary", ""):
-            logger.info(f"Found completed paper '{paper_id}' with summary in DynamoDB")
+        processing = dynamo_data.get("processing", False)
+        if not processing and dynamo_data.get("summary", ""):
+            logger.debug("Found completed paper '%s' with summary in DynamoDB", paper_id)
             return dynamo_data
-        elif dynamo_data.get("processing", False):
+        elif processing:
             task_id = dynamo_data.get("task_id", "unknown")
-            logger.info(f"Paper '{paper_id}' is still being processed (task_id: {task_id})")
+            logger.debug("Paper '%s' is still being processed (task_id: %s)", paper_id, task_id)
             return {
                 "message": f"Task id {task_id} is under process right now",
                 "processing": True,
                 "arxiv_id": paper_id
             }
-    logger.info(f"No data found for paper '{paper_id}'")
+    logger.debug("No data found for paper '%s'", paper_id)
     return {
         "message": f"No data found for paper ID {paper_id}",
         "arxiv_id": paper_id
     }
 
+def sanitize_arxiv_id(arxiv_id: str) -> str:
+    """Replace '/' in old-style arXiv IDs the same way enqueue does before writing the row."""
+    return arxiv_id.replace("/", "-")
+
+def parse_json_body(event) -> Optional[Dict[str, Any]]:
+    # Empty and malformed bodies are client errors, they never reach DynamoDB
+    raw_body = event.get("body")
+    if not raw_body:
+        return None
+    try:
+        body = from_json(raw_body)
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+def handle_health(event, query_params):
+    return HEALTH_RESPONSE
+
+def handle_search(event, query_params):
+    query = query_params.get("query", "")
+    page = int(query_params.get("page", 0))
+    page_size = int(query_params.get("page_size", 10))
+    sort_by = query_params.get("sort_by", "relevance")
+    result = search_papers(query, page, page_size, sort_by)
+    if "error" in result:
+        return build_response(500, result)
+    return build_response(200, result)
+
+def handle_paper(paper_id: str):
+    result = get_paper(paper_id)
+    if "message" in result and "No data found" in result.get("message", ""):
+        return build_response(404, result)
+    return build_response(200, result)
+
+def handle_papers_batch(event, query_params):
+    body = parse_json_body(event)
+    if body is None:
+        return build_response(400, {"error": "Request body must be a JSON object"})
+    arxiv_ids = body.get("ids")
+    if not isinstance(arxiv_ids, list) or not arxiv_ids or len(arxiv_ids) > BATCH_GET_MAX_KEYS:
+        return build_response(400, {"error": f"'ids' must be a list of 1 to {BATCH_GET_MAX_KEYS} arXiv IDs"})
+    if not all(isinstance(arxiv_id, str) and arxiv_id for arxiv_id in arxiv_ids):
+        return build_response(400, {"error": "Every entry in 'ids' must be a non-empty string"})
+    # Sanitized id -> the id the caller sent, so missing ids are reported as they were requested
+    original_ids = {}
+    for arxiv_id in arxiv_ids:
+        original_ids.setdefault(sanitize_arxiv_id(arxiv_id), arxiv_id)
+
+    try:
+        items = get_dynamo_summaries(list(original_ids))
+        found = {item["arxiv_id"] for item in items}
+        return build_response(200, {
+            "papers": items,
+            "missing": [arxiv_id for sanitized, arxiv_id in original_ids.items() if sanitized not in found],
+        })
+
+    except Exception as e:
+        error_message = str(e)
+        logger.error("❌ Error batch fetching papers: %s", error_message)
+        return build_response(500, {"error": f"Failed to fetch papers: {error_message}"})
+
+def handle_paper_hash(event, query_params):
+    body = parse_json_body(event)
+    if body is None:
+        return build_response(400, {"error": "Request body must be a JSON object"})
+    hash_id = body.get("hashId", "")
+    if not hash_id or not isinstance(hash_id, str):
+        return build_response(400, {"error": "Missing 'hashId' in request body"})
+
+    try:
+        arxiv_id = hash_cache.get(hash_id)
+        if arxiv_id:
+            hash_cache.move_to_end(hash_id)
+            item = get_dynamo_summary(arxiv_id)
+            if item and item.get("summary"):
+                return build_response(200, item)
+
+        # Only the first match is returned, so stop reading the index after it
+        response = table.query(
+            IndexName="hash-string-index",
+            KeyConditionExpression=Key("hash_string").eq(hash_id),
+            Limit=1
+        )
+        items = response.get("Items", [])
+        if not items:
+            return build_response(404, {"message": f"No paper found for hash ID {hash_id}"})
+
+        item = expand_item(items[0])
+        if item.get("summary"):
+            hash_cache[hash_id] = item["arxiv_id"]
+            if len(hash_cache) > HASH_CACHE_MAX_SIZE:
+                hash_cache.popitem(last=False)
+
+        return build_response(200, item)
+
+    except Exception as e:
+        error_message = str(e)
+        logger.error("❌ Error querying hash_string-index (POST): %s", error_message)
+        return build_response(500, {"error": f"Failed to fetch by hash ID: {error_message}"})
+
+# Exact routes resolve with one dict lookup, /health answers any method
+ROUTES = {
+    ("GET", "/search"): handle_search,
+    ("POST", "/paper/hash"): handle_paper_hash,
+    ("POST", "/papers/batch"): handle_papers_batch,
+}
+ANY_METHOD_ROUTES = {
+    "/health": handle_health,
+}
+PAPER_PREFIX = "/paper/"
+
 def lambda_handler(event, context):
-    logger.info(f"Received event: {json.dumps(event)}")
-    cors_headers = {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
-        "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-    }
+    # The full event is several KB, only format it when it is actually logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received event: %s", event)
+    elif EVENT_LOG_SAMPLE and random.randrange(EVENT_LOG_SAMPLE) == 0:
+        logger.info("Received event: %s", event)
 
     path = event.get("path", "")
     http_method = event.get("httpMethod", "GET")
     query_params = event.get("queryStringParameters", {}) or {}
 
-    if path == "/health":
-        return {
-            "statusCode": 200,
-            "headers": cors_headers,
-            "body": json.dumps({"status": "healthy", "service": "arxiv-search-lambda"}),
-        }
-
-    elif path == "/search" and http_method == "GET":
-        query = query_params.get("query", "")
-        page = int(query_params.get("page", 0))
-        page_size = int(query_params.get("page_size", 10))
-        sort_by = query_params.get("sort_by", "relevance")
-        result = search_papers(query, page, page_size, sort_by)
-        if "error" in result:
-            return {"statusCode": 500, "headers": cors_headers, "body": json.dumps(result)}
-        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(result)}
-
-    elif path.startswith("/paper/") and not path.startswith("/paper/hash") and http_method == "GET":
-        paper_id = path.split("/paper/")[1]
-        result = get_paper(paper_id)
-        if "message" in result and "No data found" in result.get("message", ""):
-            return {"statusCode": 404, "headers": cors_headers, "body": json.dumps(result)}
-        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(result)}
-
-    elif path == "/paper/hash" and http_method == "POST":
-        try:
-            body = json.loads(event.get("body", "{}"))
-            hash_id = body.get("hashId", "")
-            if not hash_id:
-                return {
-                    "statusCode": 400,
-                    "headers": cors_headers,
-                    "body": json.dumps({"error": "Missing 'hashId' in request body"})
-                }
-
-            response = table.query(
-                IndexName="hash-string-index",
-                KeyConditionExpression=Key("hash_string").eq(hash_id)
-            )
-            items = response.get("Items", [])
-            if not items:
-                return {
-                    "statusCode": 404,
-                    "headers": cors_headers,
-                    "body": json.dumps({"message": f"No paper found for hash ID {hash_id}"})
-                }
-
-            item = items[0]
-
-            return {
-                "statusCode": 200,
-                "headers": cors_headers,
-                "body": json.dumps(item)
-            }
+    handler = ROUTES.get((http_method, path)) or ANY_METHOD_ROUTES.get(path)
+    if handler:
+        return handler(event, query_params)
 
-        except Exception as e:
-            error_message = str(e)
-            logger.error(f"❌ Error querying hash_string-index (POST): {error_message}")
-            return {
-                "statusCode": 500,
-                "headers": cors_headers,
-                "body": json.dumps({"error": f"Failed to fetch by hash ID: {error_message}"})
-            }
+    # /paper/<id> is the only parameterized route, /paper/hash* paths are never paper ids
+    if http_method == "GET" and path.startswith(PAPER_PREFIX):
+        paper_id = path[len(PAPER_PREFIX):]
+        if paper_id and not paper_id.startswith("hash"):
+            return handle_paper(paper_id)
 
-    else:
-        return {
-            "statusCode": 404,
-            "headers": cors_headers,
-            "body": json.dumps({"error": f"Route not found: {path}"}),
-        }
+    return build_response(404, {"error": f"Route not found: {path}"})